@@ -1,11 +1,17 @@
-from fastapi import APIRouter, HTTPException, Body
-from typing import Any, Dict, List
+from fastapi import APIRouter, FastAPI, HTTPException, Body, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Callable, Dict, List
 from pydantic import BaseModel, Field
-import bson
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import json
 import os
 import time
-from app.core.generator import generate_mock_models
-from app.core.explicit_generator import generate_explicit_models
+from app.core.generator import dependency_levels, generate_mock_models, generate_mock_models_encoded
+from app.core.explicit_generator import generate_explicit_models, generate_explicit_models_encoded
+from app.core.bson_writer import encode_bson_array, write_bson_file, write_bson_fragments_file
+from app.core.pool import create_executor, spread_across_pool
 
 router = APIRouter()
 
@@ -16,8 +22,64 @@ class ModelConfig(BaseModel):
 class MockRequest(BaseModel):
     models: Dict[str, ModelConfig] = Field(..., description="Dictionary mapping model names to their configurations")
 
+def get_executor(request: Request) -> Executor:
+    """Returns the process pool the app uses for CPU-bound generation."""
+    return request.app.state.executor
+
+def restart_executor(app: FastAPI, broken: Executor) -> HTTPException:
+    """
+    Replaces a process pool that lost a worker (e.g. an OOM kill), since a broken pool fails every
+    later submission. Returns the 503 to raise for the request that hit the crash.
+    """
+    # Concurrent requests may hit the same broken pool; only the first one swaps it out
+    if app.state.executor is broken:
+        app.state.executor = create_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+    return HTTPException(status_code=503, detail="A generation worker crashed, please retry the request")
+
+# Same output settings as FastAPI's JSONResponse
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+def encode_json(value: Any) -> bytes:
+    return _JSON_ENCODER.encode(value).encode("utf-8")
+
+def generate_json(generate: Callable[[Dict[str, Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]], configs: Dict[str, Dict[str, Any]]) -> bytes:
+    """
+    Generates the models and serializes them to JSON inside the worker process,
+    so neither response validation nor encoding of large payloads runs on the event loop.
+    """
+    return encode_json(generate(configs))
+
+def generate_bson_file(generate: Callable[[Dict[str, Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]], configs: Dict[str, Dict[str, Any]], file_path: str) -> None:
+    """Generates the models and streams them to a BSON file, so both steps run inside the worker process."""
+    write_bson_file(file_path, generate(configs))
+
+def join_json_fragments(fragments: Dict[str, bytes]) -> bytes:
+    """Assembles per-model JSON arrays, already encoded by the workers, into the response object."""
+    return b"{" + b",".join(encode_json(model_name) + b":" + fragment for model_name, fragment in fragments.items()) + b"}"
+
+async def run_json_generation(executor: Executor, generate: Callable[..., Dict[str, List[Dict[str, Any]]]], generate_encoded: Callable[..., Dict[str, bytes]], configs: Dict[str, Dict[str, Any]], levels: List[List[str]]) -> bytes:
+    """
+    Generates the models as JSON without doing CPU work in the server process.
+    Usually the whole request runs in one worker. When spread_across_pool says so for the given
+    dependency levels, every model runs in its own worker and encodes its own items; the server
+    thread only waits and concatenates.
+    """
+    if spread_across_pool(configs, levels):
+        fragments = await run_in_threadpool(generate_encoded, configs, executor, encode_json)
+        return join_json_fragments(fragments)
+    return await asyncio.get_running_loop().run_in_executor(executor, generate_json, generate, configs)
+
+async def run_bson_generation(executor: Executor, generate: Callable[..., Dict[str, List[Dict[str, Any]]]], generate_encoded: Callable[..., Dict[str, bytes]], configs: Dict[str, Dict[str, Any]], levels: List[List[str]], file_path: str) -> None:
+    """Same as run_json_generation, writing a BSON file; spread requests write the workers' encoded arrays."""
+    if spread_across_pool(configs, levels):
+        fragments = await run_in_threadpool(generate_encoded, configs, executor, encode_bson_array)
+        await run_in_threadpool(write_bson_fragments_file, file_path, fragments)
+    else:
+        await asyncio.get_running_loop().run_in_executor(executor, generate_bson_file, generate, configs, file_path)
+
 @router.post("/mock/inferred", response_model=Dict[str, List[Dict[str, Any]]])
-async def generate_mock_data(request: MockRequest = Body(...)):
+async def generate_mock_data(http_request: Request, request: MockRequest = Body(...), executor: Executor = Depends(get_executor)):
     """
     Generate mock data based on provided JSON templates using heuristic inference and cross-references.
     """
@@ -26,13 +88,16 @@ async def generate_mock_data(request: MockRequest = Body(...)):
         
     try:
         configs = {name: {"count": conf.count, "template": conf.template} for name, conf in request.models.items()}
-        result = generate_mock_models(configs)
-        return result
+        levels, _ = dependency_levels(configs)
+        content = await run_json_generation(executor, generate_mock_models, generate_mock_models_encoded, configs, levels)
+        return Response(content=content, media_type="application/json")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except BrokenProcessPool:
+        raise restart_executor(http_request.app, executor)
 
 @router.post("/mock/inferred/bson", response_model=Dict[str, str])
-async def generate_mock_data_bson(request: MockRequest = Body(...)):
+async def generate_mock_data_bson(http_request: Request, request: MockRequest = Body(...), executor: Executor = Depends(get_executor)):
     """
     Generate mock data based on provided JSON templates using heuristic inference and cross-references.
     Writes the BSON binary encoded data to a local file and returns the file path.
@@ -42,21 +107,20 @@ async def generate_mock_data_bson(request: MockRequest = Body(...)):
         
     try:
         configs = {name: {"count": conf.count, "template": conf.template} for name, conf in request.models.items()}
-        result = generate_mock_models(configs)
-        bson_data = bson.BSON.encode(result)
-        
         filename = f"mock_inferred_{int(time.time())}.bson"
         file_path = os.path.abspath(filename)
         
-        with open(file_path, "wb") as f:
-            f.write(bson_data)
+        levels, _ = dependency_levels(configs)
+        await run_bson_generation(executor, generate_mock_models, generate_mock_models_encoded, configs, levels, file_path)
             
         return {"message": "BSON file generated successfully", "file_path": file_path}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except BrokenProcessPool:
+        raise restart_executor(http_request.app, executor)
 
 @router.post("/mock/explicit", response_model=Dict[str, List[Dict[str, Any]]])
-async def generate_explicit_mock_data(request: MockRequest = Body(...)):
+async def generate_explicit_mock_data(http_request: Request, request: MockRequest = Body(...), executor: Executor = Depends(get_executor)):
     """
     Generate mock data strictly adhering to explicitly defined string format rules (e.g. DECIMAL2).
     """
@@ -65,13 +129,16 @@ async def generate_explicit_mock_data(request: MockRequest = Body(...)):
         
     try:
         configs = {name: {"count": conf.count, "template": conf.template} for name, conf in request.models.items()}
-        result = generate_explicit_models(configs)
-        return result
+        # Explicit models never reference each other, so they all share one level
+        content = await run_json_generation(executor, generate_explicit_models, generate_explicit_models_encoded, configs, [list(configs)])
+        return Response(content=content, media_type="application/json")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except BrokenProcessPool:
+        raise restart_executor(http_request.app, executor)
 
 @router.post("/mock/explicit/bson", response_model=Dict[str, str])
-async def generate_explicit_mock_data_bson(request: MockRequest = Body(...)):
+async def generate_explicit_mock_data_bson(http_request: Request, request: MockRequest = Body(...), executor: Executor = Depends(get_executor)):
     """
     Generate mock data strictly adhering to explicitly defined string format rules (e.g. DECIMAL2).
     Writes the BSON binary encoded data to a local file and returns the file path.
@@ -81,68 +148,73 @@ async def generate_explicit_mock_data_bson(request: MockRequest = Body(...)):
         
     try:
         configs = {name: {"count": conf.count, "template": conf.template} for name, conf in request.models.items()}
-        result = generate_explicit_models(configs)
-        bson_data = bson.BSON.encode(result)
-        
         filename = f"mock_explicit_{int(time.time())}.bson"
         file_path = os.path.abspath(filename)
         
-        with open(file_path, "wb") as f:
-            f.write(bson_data)
+        await run_bson_generation(executor, generate_explicit_models, generate_explicit_models_encoded, configs, [list(configs)], file_path)
             
         return {"message": "BSON file generated successfully", "file_path": file_path}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except BrokenProcessPool:
+        raise restart_executor(http_request.app, executor)
 
-@router.get("/sample/inferred", response_model=Dict[str, Any])
-async def get_sample_inferred_payload():
-    """Returns a sample payload using heuristic type inference and relational data mapping."""
-    return {
-      "models": {
-        "User": {
-          "count": 2,
-          "template": {
-            "user_id": 0,
-            "name": "string",
-            "email_address": "test@example.com",
-            "is_active": True
-          }
-        },
-        "Order": {
-          "count": 5,
-          "template": {
-            "order_id": 0,
-            "user_id": "$ref:User.user_id",
-            "total_price": 100.50,
-            "status": "string"
+# Sample payloads never change, so they are serialized once at import and served as raw JSON
+_SAMPLE_INFERRED: Dict[str, Any] = {
+  "models": {
+    "User": {
+      "count": 2,
+      "template": {
+        "user_id": 0,
+        "name": "string",
+        "email_address": "test@example.com",
+        "is_active": True
+      }
+    },
+    "Order": {
+      "count": 5,
+      "template": {
+        "order_id": 0,
+        "user_id": "$ref:User.user_id",
+        "total_price": 100.50,
+        "status": "string"
+      }
+    }
+  }
+}
+_SAMPLE_INFERRED_JSON = json.dumps(_SAMPLE_INFERRED).encode("utf-8")
+
+_SAMPLE_EXPLICIT: Dict[str, Any] = {
+  "models": {
+    "Product": {
+      "count": 3,
+      "template": {
+        "id": "UUID",
+        "cost": "DECIMAL2",
+        "name": "STRING_ALPHA",
+        "sku": "STRING_ALPHA_NUMERIC",
+        "secret_code": "STRING",
+        "created_at": "TIMESTAMP(%Y-%m-%dT%H:%M:%S)",
+        "views": "INTEGER",
+        "global_id": "LONG",
+        "related_items": [
+          {
+            "item_id": "UUID",
+            "score": "INTEGER"
           }
-        }
+        ]
       }
     }
+  }
+}
+_SAMPLE_EXPLICIT_JSON = json.dumps(_SAMPLE_EXPLICIT).encode("utf-8")
+
+@router.get("/sample/inferred", response_model=Dict[str, Any])
+async def get_sample_inferred_payload():
+    """Returns a sample payload using heuristic type inference and relational data mapping."""
+    return Response(content=_SAMPLE_INFERRED_JSON, media_type="application/json")
 
 @router.get("/sample/explicit", response_model=Dict[str, Any])
 async def get_sample_explicit_payload():
     """Returns a sample payload using the explicit string type generator functionality."""
-    return {
-      "models": {
-        "Product": {
-          "count": 3,
-          "template": {
-            "id": "UUID",
-            "cost": "DECIMAL2",
-            "name": "STRING_ALPHA",
-            "sku": "STRING_ALPHA_NUMERIC",
-            "secret_code": "STRING",
-            "created_at": "TIMESTAMP(%Y-%m-%dT%H:%M:%S)",
-            "views": "INTEGER",
-            "global_id": "LONG",
-            "related_items": [
-              {
-                "item_id": "UUID",
-                "score": "INTEGER"
-              }
-            ]
-          }
-        }
-      }
-    }
+    return Response(content=_SAMPLE_EXPLICIT_JSON, media_type="application/json")
@@ -0,0 +1,81 @@
+import io
+import os
+import struct
+import bson
+from bson.errors import InvalidDocument
+from typing import Any, BinaryIO, Callable, Dict, List
+
+def _begin_document(f: BinaryIO) -> int:
+    # Reserve the int32 length prefix; it is patched in by _end_document
+    start = f.tell()
+    f.write(b"\x00\x00\x00\x00")
+    return start
+
+def _end_document(f: BinaryIO, start: int) -> None:
+    f.write(b"\x00")
+    end = f.tell()
+    f.seek(start)
+    f.write(struct.pack("<i", end - start))
+    f.seek(end)
+
+def _element_name(name: str) -> bytes:
+    if "\x00" in name:
+        raise InvalidDocument(f"Key names must not contain the NULL byte: {name!r}")
+    return name.encode("utf-8") + b"\x00"
+
+def _write_array(f: BinaryIO, items: List[Dict[str, Any]]) -> None:
+    # An array is stored as an embedded document keyed "0", "1", ...
+    array_start = _begin_document(f)
+    for index, item in enumerate(items):
+        # 0x03: embedded document
+        f.write(b"\x03" + _element_name(str(index)))
+        f.write(bson.BSON.encode(item))
+    _end_document(f, array_start)
+
+def write_bson(f: BinaryIO, context: Dict[str, List[Dict[str, Any]]]) -> None:
+    """
+    Writes the generated context to a seekable binary file as a single BSON document,
+    the same shape bson.BSON.encode(context) produces.
+    Items are encoded one at a time so the whole payload never exists as one bytes blob.
+    """
+    doc_start = _begin_document(f)
+    for model_name, items in context.items():
+        # 0x04: array
+        f.write(b"\x04" + _element_name(model_name))
+        _write_array(f, items)
+    _end_document(f, doc_start)
+
+def encode_bson_array(items: List[Dict[str, Any]]) -> bytes:
+    """Encodes one model's items as a BSON array body, to be assembled by write_bson_fragments."""
+    buffer = io.BytesIO()
+    _write_array(buffer, items)
+    return buffer.getvalue()
+
+def write_bson_fragments(f: BinaryIO, fragments: Dict[str, bytes]) -> None:
+    """
+    Writes per-model arrays from encode_bson_array as the same single document write_bson produces.
+    The arrays are already encoded, so this only adds the outer framing.
+    """
+    doc_start = _begin_document(f)
+    for model_name, fragment in fragments.items():
+        f.write(b"\x04" + _element_name(model_name))
+        f.write(fragment)
+    _end_document(f, doc_start)
+
+def _write_file(file_path: str, write: Callable[[BinaryIO], None]) -> None:
+    # If encoding fails partway, the truncated file is removed before the error is re-raised
+    try:
+        with open(file_path, "wb") as f:
+            write(f)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+def write_bson_file(file_path: str, context: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Writes the generated context to a BSON file with write_bson, leaving no partial file on error."""
+    _write_file(file_path, lambda f: write_bson(f, context))
+
+def write_bson_fragments_file(file_path: str, fragments: Dict[str, bytes]) -> None:
+    """Writes encoded per-model arrays to a BSON file with write_bson_fragments, leaving no partial file on error."""
+    _write_file(file_path, lambda f: write_bson_fragments(f, fragments))
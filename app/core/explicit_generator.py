@@ -1,152 +1,246 @@
 import re
 import uuid
 import string
-import random
 import hashlib
 import json
-from datetime import datetime
-from faker import Faker
-from typing import Any, Dict, List
+from datetime import datetime, timedelta
+from functools import lru_cache
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+from app.core.rng import get_rng
 
-fake = Faker()
+# Character pools are concatenated once at import rather than on every call
+_ALPHA = string.ascii_letters
+_NUMERIC = string.digits
+_ALPHA_NUMERIC = string.ascii_letters + string.digits
+_ALL_CHARS = string.ascii_letters + string.digits + string.punctuation
 
-def generate_random_string(length: int = 10, chars: str = string.ascii_letters + string.digits + string.punctuation) -> str:
-    return ''.join(random.choice(chars) for _ in range(length))
+def generate_random_string(length: int = 10, chars: str = _ALL_CHARS) -> str:
+    return ''.join(get_rng().choices(chars, k=length))
 
-def process_explicit_value(template_value: str) -> Any:
+# Timestamps fall within the last five years
+_TIMESTAMP_RANGE_SECONDS = 5 * 365 * 24 * 3600
+
+def _generate_timestamp(format_str: Optional[str]) -> str:
+    dt = datetime.now() - timedelta(seconds=get_rng().randint(0, _TIMESTAMP_RANGE_SECONDS))
+    if format_str:
+        return dt.strftime(format_str)
+    return dt.isoformat()
+
+def _generate_decimal(precision: int) -> float:
+    # Generate a random float between 0 and 10000
+    val = get_rng().uniform(0.0, 10000.0)
+    return round(val, precision)
+
+# Rules that take no parameters map straight to their generator
+_CONST_RULES: Dict[str, Callable[[], Any]] = {
+    "STRING": lambda: generate_random_string(15),
+    "STRING_NUMERIC": lambda: generate_random_string(10, _NUMERIC),
+    "STRING_ALPHA": lambda: generate_random_string(10, _ALPHA),
+    "STRING_ALPHA_NUMERIC": lambda: generate_random_string(15, _ALPHA_NUMERIC),
+    "INTEGER": lambda: get_rng().randint(0, 1000000),
+    "LONG": lambda: get_rng().randint(1000000000, 999999999999),
+}
+
+_TS_RE = re.compile(r"^TIMESTAMP(?:\((.*)\))?$")
+_DEC_RE = re.compile(r"^DECIMAL(\d+)$")
+
+@lru_cache(maxsize=1024)
+def _resolve(template_value: str) -> Callable[[], Any]:
     """
-    Parses a string rule and returns the generated data type.
-    If it doesn't match a known rule, returns the string as-is.
+    Parses a string rule once and returns a callable producing the generated data type.
+    If it doesn't match a known rule, the callable returns the string as-is.
     """
-    if template_value == "STRING":
-        return generate_random_string(15)
-        
-    if template_value == "STRING_NUMERIC":
-        return generate_random_string(10, string.digits)
-        
-    if template_value == "STRING_ALPHA":
-        return generate_random_string(10, string.ascii_letters)
-        
-    if template_value == "STRING_ALPHA_NUMERIC":
-        return generate_random_string(15, string.ascii_letters + string.digits)
-        
-    if template_value == "INTEGER":
-        return random.randint(0, 1000000)
-        
-    if template_value == "LONG":
-        return random.randint(1000000000, 999999999999)
-        
+    fn = _CONST_RULES.get(template_value)
+    if fn:
+        return fn
+
     # Check for TIMESTAMP(...)
-    timestamp_match = re.match(r"^TIMESTAMP(?:\((.*)\))?$", template_value)
+    timestamp_match = _TS_RE.match(template_value)
     if timestamp_match:
-        dt = fake.date_time_between(start_date='-5y', end_date='now')
         format_str = timestamp_match.group(1)
-        if format_str:
-            return dt.strftime(format_str)
-        return dt.isoformat()
-        
+        return lambda: _generate_timestamp(format_str)
+
     # Check for DECIMAL{N}
-    decimal_match = re.match(r"^DECIMAL(\d+)$", template_value)
+    decimal_match = _DEC_RE.match(template_value)
     if decimal_match:
         precision = int(decimal_match.group(1))
-        # Generate a random float between 0 and 10000
-        val = random.uniform(0.0, 10000.0)
-        return round(val, precision)
+        return lambda: _generate_decimal(precision)
+
+    # UUID and UUID_HASH markers are filled in by the enclosing object's builder,
+    # as UUID_HASH requires hashing the rest of the generated object.
+    return lambda: template_value
+
+def process_explicit_value(template_value: str) -> Any:
+    """
+    Parses a string rule and returns the generated data type.
+    If it doesn't match a known rule, returns the string as-is.
+    """
+    return _resolve(template_value)()
+
+# json.dumps builds a fresh encoder whenever options are passed, so keep one around.
+# Compact separators also shrink the string that gets hashed.
+_HASH_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
+def _content_uuid(payload: Dict[str, Any]) -> str:
+    """Hashes a generated payload into a reproducible UUID-formatted string."""
+    payload_json_str = _HASH_ENCODER.encode(payload)
+    digest = hashlib.md5(payload_json_str.encode('utf-8')).digest()
+    
+    # uuid.UUID formats the 16 digest bytes into the standard 8-4-4-4-12 layout
+    return str(uuid.UUID(bytes=digest))
+
+def _placeholder() -> None:
+    return None
+
+def _compile_dict(template: Dict[str, Any]) -> Callable[[], Dict[str, Any]]:
+    """
+    Compiles an object template. "UUID" and "UUID_HASH" markers are found here once,
+    so the builder fills them in directly instead of rescanning every generated item.
+    """
+    uuid_keys = [k for k, v in template.items() if v == "UUID"]
+    hash_keys = [k for k, v in template.items() if v == "UUID_HASH"]
+    # Markers get a placeholder so generated items keep the template's key order
+    subs = [(k, _placeholder if v in ("UUID", "UUID_HASH") else compile_template(v)) for k, v in template.items()]
+    
+    if not uuid_keys and not hash_keys:
+        return lambda: {k: f() for k, f in subs}
         
-    # UUID is handled post-generation as it requires hashing the payload
-    # But if someone just wants a raw UUID field without hashing the whole payload payload:
-    # We will let the post-processor handle "UUID" specifically.
+    marker_keys = set(uuid_keys).union(hash_keys)
     
-    return template_value
+    def build() -> Dict[str, Any]:
+        data = {k: f() for k, f in subs}
+        if hash_keys:
+            # UUID_HASH hashes the item without its marker fields
+            content_uuid = _content_uuid({k: v for k, v in data.items() if k not in marker_keys})
+            for k in hash_keys:
+                data[k] = content_uuid
+        if uuid_keys:
+            # Plain UUIDs are only identifiers, so a random one avoids serializing the payload
+            random_uuid = str(uuid.uuid4())
+            for k in uuid_keys:
+                data[k] = random_uuid
+        return data
+        
+    return build
 
-def generate_explicit_mock_item(template: Any) -> Any:
+def compile_template(template: Any) -> Callable[[], Any]:
     """
-    Recursively generates mock data based strictly on string type definitions.
+    Walks a template once and returns a builder that generates one mock value for it.
+    Type dispatch happens here rather than for every generated item.
     """
     if isinstance(template, dict):
-        return {k: generate_explicit_mock_item(v) for k, v in template.items()}
+        return _compile_dict(template)
     elif isinstance(template, list):
         if not template:
-            return []
-            
+            return lambda: []
+
         # If the template array has only 1 element, repeating that template 3 times is standard behavior
         if len(template) == 1:
-            item_template = template[0]
-            return [generate_explicit_mock_item(item_template) for _ in range(3)]
-            
+            f = compile_template(template[0])
+            return lambda: [f(), f(), f()]
+
         # Otherwise, strictly generate the exact mocked sequence passed
-        return [generate_explicit_mock_item(item) for item in template]
+        builders = [compile_template(item) for item in template]
+        return lambda: [f() for f in builders]
     elif isinstance(template, str):
-        return process_explicit_value(template)
-    
+        return _resolve(template)
+
     # If it's an int, float, bool, or None, just return it as a literal exactly as it is.
-    return template
+    return lambda: template
 
-def apply_post_generation_rules(item: Any) -> Any:
-    """
-    Applies rules that require the entire generated payload, such as hashing it into a UUID format.
-    Recursively applies this down to sub-objects and arrays.
-    """
-    if isinstance(item, list):
-        return [apply_post_generation_rules(child) for child in item]
+def _integer_column(low: int, high: int) -> Callable[[int], List[int]]:
+    values = range(low, high + 1)
+    return lambda count: get_rng().choices(values, k=count)
+
+def _decimal_column(precision: int) -> Callable[[int], List[float]]:
+    def column(count: int) -> List[float]:
+        # Same distribution as _generate_decimal, without a uniform() call per value
+        random = get_rng().random
+        return [round(random() * 10000.0, precision) for _ in range(count)]
+    return column
+
+# Numeric rules with a dedicated whole-column generator
+_CONST_COLUMNS: Dict[str, Callable[[int], List[Any]]] = {
+    "INTEGER": _integer_column(0, 1000000),
+    "LONG": _integer_column(1000000000, 999999999999),
+}
+
+def _compile_column(template_value: Any) -> Callable[[int], List[Any]]:
+    """Returns a callable generating `count` values for a single scalar template field."""
+    if not isinstance(template_value, str):
+        return lambda count: [template_value] * count
         
-    if not isinstance(item, dict):
-        return item
+    column = _CONST_COLUMNS.get(template_value)
+    if column:
+        return column
         
-    has_uuid_marker = False
-    uuid_keys = []
-    
-    # Simple search for the "UUID" value marker
-    for k, v in item.items():
-        if v == "UUID":
-            has_uuid_marker = True
-            uuid_keys.append(k)
-        elif isinstance(v, (dict, list)):
-            item[k] = apply_post_generation_rules(v)
-            
-    if not has_uuid_marker:
-        return item
+    decimal_match = _DEC_RE.match(template_value)
+    if decimal_match:
+        return _decimal_column(int(decimal_match.group(1)))
         
-    # Create a copy of the item without the UUID fields to hash
-    hashable_payload = {k: v for k, v in item.items() if k not in uuid_keys}
-    
-    # Hash the payload to generate a reproducible "UUID" based on content
-    payload_json_str = json.dumps(hashable_payload, sort_keys=True)
-    md5_hash = hashlib.md5(payload_json_str.encode('utf-8')).hexdigest()
-    
-    # Format the MD5 hash into a UUID standard format (8-4-4-4-12)
-    custom_uuid = f"{md5_hash[:8]}-{md5_hash[8:12]}-{md5_hash[12:16]}-{md5_hash[16:20]}-{md5_hash[20:]}"
+    f = _resolve(template_value)
+    return lambda count: [f() for _ in range(count)]
+
+def compile_columns(template: Dict[str, Any]) -> Optional[Callable[[int], List[Dict[str, Any]]]]:
+    """
+    Compiles a flat template (scalar rules only) into a builder that generates all items
+    column by column, then zips the columns into rows.
+    Returns None for templates that need the per-item builder: nested objects/arrays or UUID_HASH.
+    """
+    values = list(template.values())
+    if not values or "UUID_HASH" in values or any(isinstance(v, (dict, list)) for v in values):
+        return None
+        
+    keys = list(template)
+    # None marks a UUID field; all UUID fields of an item share one value
+    columns = [None if v == "UUID" else _compile_column(v) for v in values]
+    has_uuid = "UUID" in values
     
-    # Assign the hash to requested keys
-    result = item.copy()
-    for k in uuid_keys:
-        result[k] = custom_uuid
+    def build(count: int) -> List[Dict[str, Any]]:
+        uuids = [str(uuid.uuid4()) for _ in range(count)] if has_uuid else None
+        generated = [uuids if column is None else column(count) for column in columns]
+        return [dict(zip(keys, row)) for row in zip(*generated)]
         
-    return result
+    return build
+
+def compile_model(template: Dict[str, Any]) -> Callable[[int], List[Dict[str, Any]]]:
+    """Compiles a model template into a callable generating `count` items."""
+    # Flat templates are generated a column at a time, anything else item by item
+    build_columns = compile_columns(template)
+    if build_columns is not None:
+        return build_columns
+    builder = compile_template(template)
+    return lambda count: [builder() for _ in range(count)]
+
+@lru_cache(maxsize=256)
+def _compile_model_cached(template_json: str) -> Callable[[int], List[Dict[str, Any]]]:
+    return compile_model(json.loads(template_json))
+
+def generate_model(template: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+    """Generates `count` items for a single explicit template."""
+    # Clients tend to resend the same schema, so compiled templates are reused across requests.
+    # The JSON text keeps key order, which the generated items follow.
+    return _compile_model_cached(json.dumps(template))(count)
 
 def generate_explicit_models(models_config: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
     """
     Generates data mapping according to explicit type rules.
     Currently, explicit generator does not resolve $ref dependencies, it's a structural 1:1 generator.
     """
-    context: Dict[str, List[Dict[str, Any]]] = {}
-    
-    for model_name, config in models_config.items():
-        count = config["count"]
-        template = config["template"]
-        
-        generated_items = []
-        for _ in range(count):
-            raw_item = generate_explicit_mock_item(template)
-            
-            # Since top-level is expected to be a dict, process post-generation rules
-            if isinstance(raw_item, dict):
-                processed_item = apply_post_generation_rules(raw_item)
-            else:
-                processed_item = raw_item
-                
-            generated_items.append(processed_item)
-            
-        context[model_name] = generated_items
-        
-    return context
+    return {model_name: generate_model(config["template"], config["count"]) for model_name, config in models_config.items()}
+
+def generate_model_encoded(template: Dict[str, Any], count: int, encode: Callable[[List[Dict[str, Any]]], bytes]) -> bytes:
+    """Generates a single model and encodes it, meant to run in a worker process."""
+    return encode(generate_model(template, count))
+
+def generate_explicit_models_encoded(models_config: Dict[str, Dict[str, Any]], executor: Executor, encode: Callable[[List[Dict[str, Any]]], bytes]) -> Dict[str, bytes]:
+    """
+    Generates every model concurrently on the executor, since explicit models are independent.
+    Returns each model's items as encoded by `encode` (which must be picklable), in request order.
+    """
+    futures = {
+        model_name: executor.submit(generate_model_encoded, config["template"], config["count"], encode)
+        for model_name, config in models_config.items()
+    }
+    return {model_name: future.result() for model_name, future in futures.items()}
@@ -1,172 +1,269 @@
-from typing import Any, Dict, List, Set
-from faker import Faker
-import random
-
-fake = Faker()
+import json
+import uuid
+from concurrent.futures import Executor
+from functools import lru_cache
+from operator import methodcaller
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from app.core.rng import get_faker, get_rng
 
 def find_dependencies(template: Any, prefix="$ref:") -> Set[str]:
     """Finds all model dependencies in a template based on the $ref format."""
-    deps = set()
-    if isinstance(template, dict):
-        for v in template.values():
-            deps.update(find_dependencies(v, prefix))
-    elif isinstance(template, list):
-        for item in template:
-            deps.update(find_dependencies(item, prefix))
-    elif isinstance(template, str) and template.startswith(prefix):
+    if isinstance(template, str):
+        if not template.startswith(prefix):
+            return set()
         # Format: "$ref:ModelName.field_name"
-        parts = template[len(prefix):].split('.')
-        if len(parts) >= 1:
-            deps.add(parts[0])
+        return {template[len(prefix):].split('.')[0]}
+    if not isinstance(template, (dict, list)):
+        return set()
+
+    deps: Set[str] = set()
+    children = template.values() if isinstance(template, dict) else template
+    for child in children:
+        deps.update(find_dependencies(child, prefix))
     return deps
 
-def resolve_ref(ref_string: str, context: Dict[str, List[Dict[str, Any]]], prefix="$ref:") -> Any:
-    """Resolves a $ref string against the generated context."""
+def parse_ref(ref_string: str, prefix="$ref:") -> Tuple[str, str]:
+    """Splits a $ref string into its (model_name, field_name) parts."""
     path = ref_string[len(prefix):]
     parts = path.split('.')
     if len(parts) != 2:
         raise ValueError(f"Invalid reference format: {ref_string}. Expected $ref:ModelName.field_name")
-        
-    model_name, field_name = parts
+    return parts[0], parts[1]
+
+def find_refs(template: Any, prefix="$ref:") -> Set[Tuple[str, str]]:
+    """Finds the parsed (model_name, field_name) references a template generates values from."""
+    if isinstance(template, dict):
+        refs: Set[Tuple[str, str]] = set()
+        for v in template.values():
+            refs.update(find_refs(v, prefix))
+        return refs
+    elif isinstance(template, list):
+        # Only the first element of an array template is generated
+        return find_refs(template[0], prefix) if template else set()
+    elif isinstance(template, str) and template.startswith(prefix):
+        return {parse_ref(template, prefix)}
+    return set()
+
+def check_ref(model_name: str, field_name: str, context: Dict[str, List[Dict[str, Any]]]) -> None:
+    """
+    Validates a parsed reference against the generated context.
+    Items of a model all share the template's fields, so this is checked once per model rather than per item.
+    """
     if model_name not in context or not context[model_name]:
         raise ValueError(f"Referenced model '{model_name}' has not been generated or is empty.")
         
-    # Randomly pick an item from the already generated list for that model
-    selected_item = random.choice(context[model_name])
-    if field_name not in selected_item:
+    if field_name not in context[model_name][0]:
         raise ValueError(f"Field '{field_name}' not found in generated model '{model_name}'.")
-        
-    return selected_item[field_name]
 
-def generate_mock_value(key: str, template_value: Any, context: Dict[str, List[Dict[str, Any]]]) -> Any:
+def _fake(method: str, **kwargs: Any) -> Callable[[Dict[str, List[Dict[str, Any]]]], Any]:
+    """Returns a field generator calling the given Faker method on the current thread's Faker."""
+    call = methodcaller(method, **kwargs)
+    return lambda context: call(get_faker())
+
+# Non-locale values skip Faker's provider dispatch and use the thread's Random directly
+def _random_int(low: int, high: int) -> Callable[[Dict[str, List[Dict[str, Any]]]], int]:
+    return lambda context: get_rng().randint(low, high)
+
+def _random_float(low: float, high: float) -> Callable[[Dict[str, List[Dict[str, Any]]]], float]:
+    # Up to 3 integer digits and 2 decimals, like fake.pyfloat(left_digits=3, right_digits=2)
+    return lambda context: round(get_rng().uniform(low, high), 2)
+
+def compile_field(key: str, template_value: Any) -> Callable[[Dict[str, List[Dict[str, Any]]]], Any]:
     """
-    Recursively generates mock data for a given key and template value.
-    Infers the type of data to generate based on the value type and key name heuristics.
-    Resolves relations if the value is a string starting with $ref:
+    Infers, once per template field, the generator to use based on the value type and key name heuristics.
+    Returns a callable that takes the generated context and produces the value for one item.
+    Relations (strings starting with $ref:) are parsed here and resolved against the context on each call;
+    callers must check_ref them first.
     """
     # Handle nested structures
     if isinstance(template_value, dict):
-        return {k: generate_mock_value(k, v, context) for k, v in template_value.items()}
+        fields = [(k, compile_field(k, v)) for k, v in template_value.items()]
+        return lambda context: {k: f(context) for k, f in fields}
     elif isinstance(template_value, list):
         if not template_value:
-            return []
-        item_template = template_value[0]
-        return [generate_mock_value(key, item_template, context) for _ in range(len(template_value))]
+            return lambda context: []
+        item_generator = compile_field(key, template_value[0])
+        length = len(template_value)
+        return lambda context: [item_generator(context) for _ in range(length)]
     
     # Handle reference resolution
     if isinstance(template_value, str) and template_value.startswith("$ref:"):
-        return resolve_ref(template_value, context)
+        model_name, field_name = parse_ref(template_value)
+        # References are validated up front by check_ref, so this only picks a random item
+        return lambda context: get_rng().choice(context[model_name])[field_name]
     
     # Heuristics for Strings
     if isinstance(template_value, str):
         key_lower = key.lower()
         if 'email' in key_lower:
-            return fake.email()
+            return _fake("email")
         elif 'first_name' in key_lower or 'firstname' in key_lower:
-            return fake.first_name()
+            return _fake("first_name")
         elif 'last_name' in key_lower or 'lastname' in key_lower:
-            return fake.last_name()
+            return _fake("last_name")
         elif 'name' in key_lower:
-            return fake.name()
+            return _fake("name")
         elif 'address' in key_lower:
-            return fake.address()
+            return _fake("address")
         elif 'city' in key_lower:
-            return fake.city()
+            return _fake("city")
         elif 'state' in key_lower:
-            return fake.state()
+            return _fake("state")
         elif 'country' in key_lower:
-            return fake.country()
+            return _fake("country")
         elif 'zip' in key_lower or 'postal' in key_lower:
-            return fake.zipcode()
+            return _fake("zipcode")
         elif 'phone' in key_lower:
-            return fake.phone_number()
+            return _fake("phone_number")
         elif 'company' in key_lower:
-            return fake.company()
+            return _fake("company")
         elif 'job' in key_lower or 'title' in key_lower:
-            return fake.job()
+            return _fake("job")
         elif 'description' in key_lower or 'bio' in key_lower:
-            return fake.text(max_nb_chars=200)
+            return _fake("text", max_nb_chars=200)
         elif 'date' in key_lower:
-            return fake.date()
+            return _fake("date")
         elif 'time' in key_lower:
-            return fake.time()
+            return _fake("time")
         elif 'url' in key_lower or 'website' in key_lower:
-            return fake.url()
+            return _fake("url")
         elif 'uuid' in key_lower or ('id' in key_lower and key_lower != 'id'):
-            return fake.uuid4()
+            return lambda context: str(uuid.uuid4())
         elif 'color' in key_lower:
-            return fake.color_name()
+            return _fake("color_name")
         else:
-            return fake.word()
+            return _fake("word")
 
     # Heuristics for Numbers
     elif isinstance(template_value, int) and not isinstance(template_value, bool):
         key_lower = key.lower()
         if 'id' == key_lower or 'id' in key_lower:
-            return fake.random_int(min=1, max=999999)
+            return _random_int(1, 999999)
         elif 'age' in key_lower:
-            return fake.random_int(min=1, max=100)
+            return _random_int(1, 100)
         elif 'year' in key_lower:
-            return int(fake.year())
-        return fake.random_int(min=0, max=1000)
+            return lambda context: int(get_faker().year())
+        return _random_int(0, 1000)
         
     elif isinstance(template_value, float):
         key_lower = key.lower()
         if 'price' in key_lower or 'amount' in key_lower or 'cost' in key_lower or 'balance' in key_lower:
-            return round(fake.pyfloat(left_digits=3, right_digits=2, positive=True), 2)
-        return fake.pyfloat(left_digits=3, right_digits=2)
+            return _random_float(0.01, 999.99)
+        return _random_float(-999.99, 999.99)
         
     elif isinstance(template_value, bool):
-        return fake.boolean()
+        return lambda context: bool(get_rng().getrandbits(1))
         
     elif template_value is None:
-        return None
+        return lambda context: None
         
     # Default fallback
-    return fake.word()
+    return _fake("word")
 
-def generate_mock_models(models_config: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+@lru_cache(maxsize=256)
+def _compile_model_cached(template_json: str) -> Tuple[List[Tuple[str, Callable[[Dict[str, List[Dict[str, Any]]]], Any]]], Set[Tuple[str, str]]]:
     """
-    Takes a dictionary mapping model names to their configurations (count, template)
-    Resolves their dependency execution order, and generates the context dictionary.
+    Compiles a model template, keyed by its JSON text so repeated schemas skip the heuristics walk.
+    Returns the compiled fields and the references they need checked against the context.
+    """
+    template = json.loads(template_json)
+    return [(k, compile_field(k, v)) for k, v in template.items()], find_refs(template)
+
+def generate_model(template: Dict[str, Any], count: int, context: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Generates `count` items for a single model; `context` must hold every model it references."""
+    compiled, refs = _compile_model_cached(json.dumps(template))
+    for ref_model, ref_field in refs:
+        check_ref(ref_model, ref_field, context)
+    return [{k: f(context) for k, f in compiled} for _ in range(count)]
+
+def dependency_levels(models_config: Dict[str, Dict[str, Any]]) -> Tuple[List[List[str]], Dict[str, Set[str]]]:
+    """
+    Resolves the dependency execution order of the models.
+    Returns the models grouped into levels, where each level only depends on earlier levels,
+    along with each model's set of referenced models.
     """
     # 1. Build Adjacency List for dependencies
     graph = {model_name: find_dependencies(config["template"]) for model_name, config in models_config.items()}
     
-    # 2. Topological Sort to find execution order
-    execution_order = []
-    visited = set()
-    temp_visited = set()
-    
-    def visit(node):
-        if node in temp_visited:
-            raise ValueError(f"Circular dependency detected involving model: {node}")
-        if node not in visited:
-            temp_visited.add(node)
-            for neighbor in graph.get(node, []):
-                if neighbor not in models_config:
-                    raise ValueError(f"Model '{node}' depends on unknown model '{neighbor}'")
-                visit(neighbor)
-            temp_visited.remove(node)
-            visited.add(node)
-            execution_order.append(node)
+    # 2. Topological Sort (Kahn's algorithm) to find execution order
+    in_degree = {model_name: len(deps) for model_name, deps in graph.items()}
+    dependents: Dict[str, List[str]] = {model_name: [] for model_name in graph}
+    for model_name, deps in graph.items():
+        for dep in deps:
+            if dep not in models_config:
+                raise ValueError(f"Model '{model_name}' depends on unknown model '{dep}'")
+            dependents[dep].append(model_name)
             
-    for model_name in models_config:
-        if model_name not in visited:
-            visit(model_name)
-            
-    # 3. Generate data in correct order
-    context: Dict[str, List[Dict[str, Any]]] = {}
-    for model_name in execution_order:
-        config = models_config[model_name]
-        count = config["count"]
-        template = config["template"]
+    ready = [model_name for model_name, degree in in_degree.items() if degree == 0]
+    levels: List[List[str]] = []
+    while ready:
+        levels.append(ready)
+        next_ready = []
+        for node in ready:
+            for dependent in dependents[node]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    next_ready.append(dependent)
+        ready = next_ready
+                
+    if sum(len(level) for level in levels) != len(graph):
+        # A leftover model may only depend on a cycle, so walk leftover dependencies
+        # until a model repeats; that model is on the cycle itself
+        node = next(model_name for model_name, degree in in_degree.items() if degree > 0)
+        walked: Set[str] = set()
+        while node not in walked:
+            walked.add(node)
+            node = next(dep for dep in graph[node] if in_degree[dep] > 0)
+        raise ValueError(f"Circular dependency detected involving model: {node}")
         
-        generated_items = []
-        for _ in range(count):
-            mock_item = {k: generate_mock_value(k, v, context) for k, v in template.items()}
-            generated_items.append(mock_item)
+    return levels, graph
+
+def generate_mock_models(models_config: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Takes a dictionary mapping model names to their configurations (count, template)
+    Resolves their dependency execution order, and generates the context dictionary.
+    """
+    levels, _ = dependency_levels(models_config)
+    
+    # Generate data in correct order
+    context: Dict[str, List[Dict[str, Any]]] = {}
+    for level in levels:
+        for model_name in level:
+            config = models_config[model_name]
+            context[model_name] = generate_model(config["template"], config["count"], context)
             
-        context[model_name] = generated_items
-        
     return context
+
+def generate_model_encoded(template: Dict[str, Any], count: int, context: Dict[str, List[Dict[str, Any]]], encode: Callable[[List[Dict[str, Any]]], bytes], keep_items: bool) -> Tuple[bytes, Optional[List[Dict[str, Any]]]]:
+    """
+    Generates a single model and encodes it, meant to run in a worker process.
+    The items themselves are only returned when `keep_items` is set, i.e. when later models reference them.
+    """
+    items = generate_model(template, count, context)
+    return encode(items), items if keep_items else None
+
+def generate_mock_models_encoded(models_config: Dict[str, Dict[str, Any]], executor: Executor, encode: Callable[[List[Dict[str, Any]]], bytes]) -> Dict[str, bytes]:
+    """
+    Generates every model on the executor, running the models of each dependency level concurrently.
+    Returns each model's items as encoded by `encode` (which must be picklable), in execution order.
+    Only models referenced by later levels are sent back as data, and each worker is only sent
+    the models it references.
+    """
+    levels, graph = dependency_levels(models_config)
+    referenced = set().union(*graph.values())
+    
+    context: Dict[str, List[Dict[str, Any]]] = {}
+    fragments: Dict[str, bytes] = {}
+    for level in levels:
+        futures = {}
+        for model_name in level:
+            config = models_config[model_name]
+            dependency_context = {dep: context[dep] for dep in graph[model_name]}
+            futures[model_name] = executor.submit(generate_model_encoded, config["template"], config["count"], dependency_context, encode, model_name in referenced)
+            
+        for model_name, future in futures.items():
+            fragments[model_name], items = future.result()
+            if items is not None:
+                context[model_name] = items
+                
+    return fragments
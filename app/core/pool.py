@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+def create_executor() -> ProcessPoolExecutor:
+    """
+    Creates the process pool that CPU-bound generation runs in, keeping it off the event loop.
+    Workers are only spawned on first use. Where available, forkserver avoids forking the threaded
+    server process; elsewhere (e.g. Windows) the platform's default start method is used.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("forkserver")
+    else:
+        mp_context = multiprocessing.get_context()
+    return ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=mp_context)
+
+# Below this many items, a model isn't worth a worker process of its own
+PARALLEL_MIN_COUNT = 1000
+
+def spread_across_pool(models_config: Dict[str, Dict[str, Any]], levels: List[List[str]]) -> bool:
+    """
+    Whether a request should be split into one pool task per model, rather than run whole in a single worker.
+    `levels` groups the models by dependency level, as models of one level can run concurrently.
+    Only worth it when some level has several models and some model has PARALLEL_MIN_COUNT items;
+    a pure chain (one model per level) would gain nothing and pay to ship every referenced model's
+    items through the server.
+    """
+    return any(len(level) > 1 for level in levels) and any(config["count"] >= PARALLEL_MIN_COUNT for config in models_config.values())
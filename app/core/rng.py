@@ -0,0 +1,31 @@
+import os
+import random
+import threading
+from faker import Faker
+
+# Each thread gets its own generators so concurrent requests don't share random state
+_tls = threading.local()
+
+def _reset_after_fork() -> None:
+    # A forked worker must not replay the parent's random sequence
+    global _tls
+    _tls = threading.local()
+
+# Only POSIX can fork; spawned workers start with fresh thread-locals anyway
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def get_rng() -> random.Random:
+    """Returns the random.Random instance owned by the calling thread."""
+    rng = getattr(_tls, "rng", None)
+    if rng is None:
+        rng = _tls.rng = random.Random()
+    return rng
+
+def get_faker() -> Faker:
+    """Returns the Faker instance owned by the calling thread, seeded from os.urandom."""
+    fake = getattr(_tls, "fake", None)
+    if fake is None:
+        fake = _tls.fake = Faker()
+        fake.seed_instance(int.from_bytes(os.urandom(8), "big"))
+    return fake
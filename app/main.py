@@ -1,7 +1,16 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.router import router as api_router
+from app.core.pool import create_executor
 
-app = FastAPI(title="Data Mocker API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.executor = create_executor()
+    yield
+    # The pool may have been replaced after a worker crash, so shut down whichever is current
+    app.state.executor.shutdown(cancel_futures=True)
+
+app = FastAPI(title="Data Mocker API", lifespan=lifespan)
 
 app.include_router(api_router)
 
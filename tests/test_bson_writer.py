@@ -0,0 +1,67 @@
+import io
+import os
+import tempfile
+import bson
+from bson.errors import InvalidDocument
+from app.core.bson_writer import encode_bson_array, write_bson, write_bson_file, write_bson_fragments
+
+def test_write_bson_matches_bson_encode():
+    context = {
+        "User": [
+            {"user_id": 1, "name": "Ada", "tags": ["a", "b"], "score": 1.5, "active": True, "nickname": None},
+            {"user_id": 2, "name": "Linus", "tags": [], "score": 2.25, "active": False, "nickname": "lt"}
+        ],
+        "Order": [
+            {
+                "order_id": 10,
+                "items": [
+                    {"sku": "X1", "quantity": 2, "options": [{"color": "red"}, {"color": "blue"}]},
+                    {"sku": "Y2", "quantity": 1, "options": []}
+                ],
+                "matrix": [[1, 2], [3, 4]],
+                "meta": {"source": "web", "notes": ["first", {"nested": [1, 2.5, "three"]}]}
+            }
+        ],
+        "Empty": []
+    }
+
+    buffer = io.BytesIO()
+    write_bson(buffer, context)
+
+    assert buffer.getvalue() == bson.BSON.encode(context)
+    assert bson.BSON(buffer.getvalue()).decode() == context
+
+def test_write_bson_fragments_matches_bson_encode():
+    context = {
+        "User": [{"user_id": 1, "tags": ["a", "b"]}, {"user_id": 2, "tags": []}],
+        "Order": [{"order_id": 10, "items": [{"sku": "X1", "options": [{"color": "red"}]}]}],
+        "Empty": []
+    }
+    fragments = {model_name: encode_bson_array(items) for model_name, items in context.items()}
+
+    buffer = io.BytesIO()
+    write_bson_fragments(buffer, fragments)
+
+    assert buffer.getvalue() == bson.BSON.encode(context)
+
+def test_write_bson_file_removes_partial_file_on_error():
+    # The first model encodes fine, then the NULL byte in the second model's name fails partway through
+    context = {
+        "User": [{"user_id": 1}],
+        "Bad\x00Name": [{"user_id": 2}]
+    }
+    file_path = os.path.join(tempfile.mkdtemp(), "mock.bson")
+
+    try:
+        write_bson_file(file_path, context)
+        assert False, "Expected InvalidDocument"
+    except InvalidDocument:
+        pass
+
+    assert not os.path.exists(file_path)
+
+if __name__ == "__main__":
+    test_write_bson_matches_bson_encode()
+    test_write_bson_fragments_matches_bson_encode()
+    test_write_bson_file_removes_partial_file_on_error()
+    print("\n✅ All BSON writer tests passed!")
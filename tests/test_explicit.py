@@ -1,10 +1,19 @@
+import hashlib
 import json
 import re
+import uuid
 from fastapi.testclient import TestClient
 from app.main import app
 
 client = TestClient(app)
 
+def setup_module():
+    # Entering the client runs the app lifespan, which creates the worker pool (and later shuts it down)
+    client.__enter__()
+
+def teardown_module():
+    client.__exit__(None, None, None)
+
 def test_explicit_mock_generation():
     payload = {
         "models": {
@@ -12,6 +21,7 @@ def test_explicit_mock_generation():
                 "count": 2,
                 "template": {
                     "id": "UUID",
+                    "content_id": "UUID_HASH",
                     "cost": "DECIMAL2",
                     "stock": "DECIMAL0",
                     "name": "STRING_ALPHA",
@@ -49,6 +59,12 @@ def test_explicit_mock_generation():
     for product in products:
         # Check UUID format
         assert re.match(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", product["id"])
+        assert re.match(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", product["content_id"])
+        assert product["content_id"] != product["id"]
+        # UUID_HASH is the MD5 of the compact, key-sorted JSON of the item without its UUID fields
+        hashed = {k: v for k, v in product.items() if k not in ("id", "content_id")}
+        digest = hashlib.md5(json.dumps(hashed, sort_keys=True, separators=(",", ":")).encode()).digest()
+        assert product["content_id"] == str(uuid.UUID(bytes=digest))
         
         # Check Decimal Types
         assert isinstance(product["cost"], float)
@@ -88,6 +104,146 @@ def test_explicit_mock_generation():
             assert isinstance(item["score"], int)
             assert re.match(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", item["item_id"])
 
+def test_explicit_flat_template():
+    payload = {
+        "models": {
+            "Reading": {
+                "count": 50,
+                "template": {
+                    "id": "UUID",
+                    "value": "DECIMAL3",
+                    "sensor": "INTEGER",
+                    "serial": "LONG",
+                    "label": "STRING_ALPHA",
+                    "unit": "celsius"
+                }
+            }
+        }
+    }
+
+    response = client.post("/mock/explicit", json=payload)
+
+    assert response.status_code == 200
+    readings = response.json()["Reading"]
+    assert len(readings) == 50
+    assert len({reading["id"] for reading in readings}) == 50
+
+    for reading in readings:
+        assert list(reading.keys()) == ["id", "value", "sensor", "serial", "label", "unit"]
+        assert isinstance(reading["value"], float)
+        assert 0 <= reading["sensor"] <= 1000000
+        assert 1000000000 <= reading["serial"] <= 999999999999
+        assert reading["label"].isalpha()
+        assert reading["unit"] == "celsius"
+
+def test_repeated_template_generates_fresh_values():
+    # Compiled templates are cached across requests; values must not be, and key order is part of the key
+    template = {
+        "id": "UUID",
+        "views": "INTEGER",
+        "label": "STRING_ALPHA"
+    }
+    payload = {"models": {"Product": {"count": 5, "template": template}}}
+
+    first = client.post("/mock/explicit", json=payload).json()["Product"]
+    second = client.post("/mock/explicit", json=payload).json()["Product"]
+
+    for product in first + second:
+        assert list(product.keys()) == ["id", "views", "label"]
+    assert {p["id"] for p in first}.isdisjoint(p["id"] for p in second)
+    assert [p["views"] for p in first] != [p["views"] for p in second]
+
+    reordered = {"models": {"Product": {"count": 5, "template": {"label": "STRING_ALPHA", "views": "INTEGER", "id": "UUID"}}}}
+    response = client.post("/mock/explicit", json=reordered)
+    assert response.status_code == 200
+    for product in response.json()["Product"]:
+        assert list(product.keys()) == ["label", "views", "id"]
+
+def test_explicit_parallel_generation():
+    # At least one model reaches PARALLEL_MIN_COUNT, so each model is generated and encoded in its own worker
+    payload = {
+        "models": {
+            "Reading": {
+                "count": 1500,
+                "template": {
+                    "id": "UUID",
+                    "value": "DECIMAL2"
+                }
+            },
+            "Product": {
+                "count": 2,
+                "template": {
+                    "name": "STRING_ALPHA",
+                    "related_items": [
+                        {
+                            "item_id": "UUID"
+                        }
+                    ]
+                }
+            }
+        }
+    }
+
+    response = client.post("/mock/explicit", json=payload)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert list(data.keys()) == ["Reading", "Product"]
+    assert len(data["Reading"]) == 1500
+    assert len({reading["id"] for reading in data["Reading"]}) == 1500
+    assert len(data["Product"]) == 2
+    for product in data["Product"]:
+        assert product["name"].isalpha()
+        assert len(product["related_items"]) == 3
+
+def test_explicit_bson_generation():
+    import bson
+    import os
+    payload = {
+        "models": {
+            "Product": {
+                "count": 3,
+                "template": {
+                    "id": "UUID",
+                    "cost": "DECIMAL2",
+                    "related_items": [
+                        {
+                            "item_id": "UUID",
+                            "score": "INTEGER"
+                        }
+                    ]
+                }
+            },
+            "Tag": {
+                "count": 2,
+                "template": {
+                    "label": "STRING_ALPHA"
+                }
+            }
+        }
+    }
+    response = client.post("/mock/explicit/bson", json=payload)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert "successfully" in data["message"]
+    file_path = data["file_path"]
+    assert os.path.exists(file_path)
+
+    with open(file_path, "rb") as f:
+        decoded_data = bson.BSON.decode(f.read())
+
+    assert list(decoded_data.keys()) == ["Product", "Tag"]
+    assert len(decoded_data["Product"]) == 3
+    assert len(decoded_data["Tag"]) == 2
+    for product in decoded_data["Product"]:
+        assert isinstance(product["cost"], float)
+        assert len(product["related_items"]) == 3
+        assert isinstance(product["related_items"][0]["score"], int)
+
+    # Clean up
+    os.remove(file_path)
+
 def test_sample_endpoints():
     res1 = client.get("/sample/inferred")
     assert res1.status_code == 200
@@ -98,6 +254,12 @@ def test_sample_endpoints():
     assert "models" in res2.json()
 
 if __name__ == "__main__":
+    setup_module()
     test_explicit_mock_generation()
+    test_explicit_flat_template()
+    test_repeated_template_generates_fresh_values()
+    test_explicit_parallel_generation()
+    test_explicit_bson_generation()
     test_sample_endpoints()
+    teardown_module()
     print("\n✅ All explicit tests passed!")
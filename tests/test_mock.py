@@ -1,9 +1,17 @@
 import json
+import re
 from fastapi.testclient import TestClient
 from app.main import app
 
 client = TestClient(app)
 
+def setup_module():
+    # Entering the client runs the app lifespan, which creates the worker pool (and later shuts it down)
+    client.__enter__()
+
+def teardown_module():
+    client.__exit__(None, None, None)
+
 def test_mock_generation():
     payload = {
         "models": {
@@ -41,6 +49,231 @@ def test_mock_generation():
     for order in data["Order"]:
         assert order["user_id"] in generated_user_ids
 
+def test_inferred_primitive_fields():
+    payload = {
+        "models": {
+            "Account": {
+                "count": 50,
+                "template": {
+                    "is_active": True,
+                    "price": 9.99,
+                    "temperature": 21.5,
+                    "age": 30,
+                    "account_id": "string"
+                }
+            }
+        }
+    }
+
+    response = client.post("/mock/inferred", json=payload)
+    assert response.status_code == 200
+    accounts = response.json()["Account"]
+    assert len(accounts) == 50
+
+    for account in accounts:
+        assert isinstance(account["is_active"], bool)
+
+        assert isinstance(account["price"], float)
+        assert 0 < account["price"] <= 999.99
+        assert round(account["price"], 2) == account["price"]
+
+        assert isinstance(account["temperature"], float)
+        assert -999.99 <= account["temperature"] <= 999.99
+        assert round(account["temperature"], 2) == account["temperature"]
+
+        assert isinstance(account["age"], int) and not isinstance(account["age"], bool)
+        assert 1 <= account["age"] <= 100
+
+        assert re.match(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", account["account_id"])
+
+def test_repeated_template_generates_fresh_values():
+    # Compiled templates are cached across requests; values must not be, and key order is part of the key
+    payload = {"models": {"User": {"count": 5, "template": {"user_id": "string", "score": 0, "nickname": "string"}}}}
+
+    first = client.post("/mock/inferred", json=payload).json()["User"]
+    second = client.post("/mock/inferred", json=payload).json()["User"]
+
+    for user in first + second:
+        assert list(user.keys()) == ["user_id", "score", "nickname"]
+    assert {u["user_id"] for u in first}.isdisjoint(u["user_id"] for u in second)
+    assert [u["score"] for u in first] != [u["score"] for u in second]
+
+    reordered = {"models": {"User": {"count": 5, "template": {"nickname": "string", "score": 0, "user_id": "string"}}}}
+    response = client.post("/mock/inferred", json=reordered)
+    assert response.status_code == 200
+    for user in response.json()["User"]:
+        assert list(user.keys()) == ["nickname", "score", "user_id"]
+
+def test_circular_dependency_reports_model_on_cycle():
+    payload = {
+        "models": {
+            "C": {"count": 1, "template": {"a_id": "$ref:A.a_id"}},
+            "A": {"count": 1, "template": {"a_id": "$ref:B.b_id"}},
+            "B": {"count": 1, "template": {"b_id": "$ref:A.a_id"}}
+        }
+    }
+
+    response = client.post("/mock/inferred", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Circular dependency detected involving model: A"
+
+def test_broken_worker_pool_is_replaced():
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+    payload = {
+        "models": {
+            "User": {
+                "count": 2,
+                "template": {
+                    "user_id": 0
+                }
+            }
+        }
+    }
+
+    # A worker exiting abruptly (as with an OOM kill) breaks the whole pool
+    broken = app.state.executor
+    try:
+        broken.submit(os._exit, 1).result()
+    except BrokenProcessPool:
+        pass
+
+    response = client.post("/mock/inferred", json=payload)
+    assert response.status_code == 503
+    assert app.state.executor is not broken
+
+    # Later requests run on the replacement pool
+    response = client.post("/mock/inferred", json=payload)
+    assert response.status_code == 200
+    assert len(response.json()["User"]) == 2
+
+def test_parallel_generation_across_levels():
+    # User and Tag share a dependency level and User reaches PARALLEL_MIN_COUNT, so every model runs in its own worker
+    payload = {
+        "models": {
+            "User": {
+                "count": 1000,
+                "template": {
+                    "user_id": 0,
+                    "name": "string"
+                }
+            },
+            "Order": {
+                "count": 1200,
+                "template": {
+                    "order_id": 0,
+                    "user_id": "$ref:User.user_id"
+                }
+            },
+            "Tag": {
+                "count": 2,
+                "template": {
+                    "label": "string"
+                }
+            }
+        }
+    }
+
+    response = client.post("/mock/inferred", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert set(data.keys()) == {"User", "Order", "Tag"}
+    assert len(data["User"]) == 1000
+    assert len(data["Order"]) == 1200
+    assert len(data["Tag"]) == 2
+
+    # Order sits in the second dependency level and only receives User's items
+    generated_user_ids = {u["user_id"] for u in data["User"]}
+    for order in data["Order"]:
+        assert order["user_id"] in generated_user_ids
+
+def test_only_levels_with_several_models_are_spread():
+    from app.core.generator import dependency_levels
+    from app.core.pool import spread_across_pool
+    chain = {
+        "User": {"count": 1000, "template": {"user_id": 0}},
+        "Order": {"count": 1000, "template": {"user_id": "$ref:User.user_id"}}
+    }
+    # One model per level leaves nothing to run concurrently
+    levels, _ = dependency_levels(chain)
+    assert not spread_across_pool(chain, levels)
+
+    chain["Tag"] = {"count": 2, "template": {"label": "string"}}
+    levels, _ = dependency_levels(chain)
+    assert spread_across_pool(chain, levels)
+
+def test_parallel_generation_worker_error():
+    payload = {
+        "models": {
+            "User": {
+                "count": 1000,
+                "template": {
+                    "user_id": 0
+                }
+            },
+            "Order": {
+                "count": 1000,
+                "template": {
+                    "user_id": "$ref:User.missing"
+                }
+            },
+            "Tag": {
+                "count": 2,
+                "template": {
+                    "label": "string"
+                }
+            }
+        }
+    }
+
+    # The ValueError is raised inside the worker generating Order and still maps to a 400
+    response = client.post("/mock/inferred", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Field 'missing' not found in generated model 'User'."
+
+def test_parallel_bson_generation():
+    import bson
+    import os
+    payload = {
+        "models": {
+            "User": {
+                "count": 1000,
+                "template": {
+                    "user_id": 0
+                }
+            },
+            "Order": {
+                "count": 3,
+                "template": {
+                    "user_id": "$ref:User.user_id"
+                }
+            },
+            "Tag": {
+                "count": 2,
+                "template": {
+                    "label": "string"
+                }
+            }
+        }
+    }
+    # Tag shares User's dependency level, so the request is spread across the pool
+    response = client.post("/mock/inferred/bson", json=payload)
+    assert response.status_code == 200
+
+    file_path = response.json()["file_path"]
+    with open(file_path, "rb") as f:
+        decoded_data = bson.BSON.decode(f.read())
+
+    assert len(decoded_data["User"]) == 1000
+    assert len(decoded_data["Tag"]) == 2
+    generated_user_ids = {u["user_id"] for u in decoded_data["User"]}
+    for order in decoded_data["Order"]:
+        assert order["user_id"] in generated_user_ids
+
+    # Clean up
+    os.remove(file_path)
+
 def test_bson_generation():
     import bson
     import os
@@ -80,6 +313,16 @@ def test_bson_generation():
     os.remove(file_path)
 
 if __name__ == "__main__":
+    setup_module()
     test_mock_generation()
+    test_inferred_primitive_fields()
+    test_repeated_template_generates_fresh_values()
+    test_circular_dependency_reports_model_on_cycle()
+    test_broken_worker_pool_is_replaced()
+    test_parallel_generation_across_levels()
+    test_only_levels_with_several_models_are_spread()
+    test_parallel_generation_worker_error()
+    test_parallel_bson_generation()
     test_bson_generation()
+    teardown_module()
     print("\n✅ All tests passed!")